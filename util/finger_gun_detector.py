@@ -1,14 +1,33 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import math
 import os
+import concurrent.futures
 import time
 import threading
+import queue
 import socket
-from datetime import datetime
-from ultralytics import YOLO
-from shot_analyzer import analyze_shot
+import sys
+from types import SimpleNamespace
+
+# Cap OpenMP threads before Torch is imported so YOLO doesn't oversubscribe
+os.environ.setdefault('OMP_NUM_THREADS', '2')
+
+from shot_analyzer import analyze_shots, warm_up_analyzer
+
+try:
+    from numba import njit, prange
+    NUMBA_ENABLED = True
+except ImportError:
+    print("Warning: numba not installed. Gesture checks run as plain Python.")
+    NUMBA_ENABLED = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
 
 try:
     import pygame
@@ -19,17 +38,41 @@ except ImportError:
     SOUND_ENABLED = False
 
 # High-vis color ranges in HSV
-HIGHVIS_YELLOW_LOWER = np.array([20, 100, 100])
-HIGHVIS_YELLOW_UPPER = np.array([45, 255, 255])
+HIGHVIS_YELLOW_LOWER = np.array([20, 100, 100], dtype=np.uint8)
+HIGHVIS_YELLOW_UPPER = np.array([45, 255, 255], dtype=np.uint8)
 
-HIGHVIS_ORANGE_LOWER = np.array([5, 150, 150])
-HIGHVIS_ORANGE_UPPER = np.array([20, 255, 255])
+HIGHVIS_ORANGE_LOWER = np.array([5, 150, 150], dtype=np.uint8)
+HIGHVIS_ORANGE_UPPER = np.array([20, 255, 255], dtype=np.uint8)
 
-HIGHVIS_GREEN_LOWER = np.array([45, 100, 100])
-HIGHVIS_GREEN_UPPER = np.array([75, 255, 255])
+HIGHVIS_GREEN_LOWER = np.array([45, 100, 100], dtype=np.uint8)
+HIGHVIS_GREEN_UPPER = np.array([75, 255, 255], dtype=np.uint8)
 
 MIN_HIGHVIS_AREA = 500
 
+# Structuring element for cleaning up the color masks
+MORPH_KERNEL = np.ones((3, 3), np.uint8)
+# Open (erode + dilate) then one more dilate with the 3x3 square is exactly an
+# erode with it followed by a single dilate with a 5x5 square
+GROW_KERNEL = np.ones((5, 5), np.uint8)
+
+# Person detector weights; a TensorRT engine is preferred when one has been exported
+# (exported models live next to this script, whatever the working directory)
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+YOLO_WEIGHTS = 'yolov8n.pt'
+YOLO_ENGINE = os.path.join(MODEL_DIR, 'yolov8n.engine')
+YOLO_IMGSZ = 640
+
+# MediaPipe Tasks hand model; when present it replaces the legacy Hands solution
+HAND_LANDMARKER_MODEL = os.path.join(MODEL_DIR, 'hand_landmarker.task')
+
+# Frames wider than this are downscaled before hand tracking; landmarks come
+# back normalized, so annotations are still drawn on the full-res frame
+HANDS_MAX_WIDTH = 960
+
+# Shots that queue up while an earlier batch is being scored are scored together,
+# up to SHOT_BATCH_MAX per YOLO call (a lone shot is never held back)
+SHOT_BATCH_MAX = 4
+
 def get_local_ip():
     """Get the local IP address of this machine"""
     try:
@@ -41,25 +84,414 @@ def get_local_ip():
     except Exception:
         return "127.0.0.1"
 
+def open_stream(cap, url):
+    """(Re)open a capture on the RTMP stream; True once a first frame has been read
+
+    VideoCapture.open() closes any previous session itself, so one capture
+    object is reused across connection attempts and reconnects.
+    """
+    # Use FFMPEG backend explicitly with low-latency options
+    if not cap.open(url, cv2.CAP_FFMPEG):
+        return False
+
+    # Set additional buffer properties
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    ret, test_frame = cap.read()
+    return ret and test_frame is not None
+
+def export_engine(batch=2):
+    """Export the YOLO weights to a persistent FP16 TensorRT engine (run once)
+
+    The engine is built with a dynamic batch of up to `batch` frames so a
+    shared PersonDetector can batch both players in one forward pass.
+    """
+    from ultralytics import YOLO
+
+    path = YOLO(YOLO_WEIGHTS).export(format='engine', half=True, imgsz=YOLO_IMGSZ,
+                                     dynamic=batch > 1, batch=batch)
+    # The engine is written next to the weights; move it to where it's loaded from
+    os.replace(path, YOLO_ENGINE)
+
+@njit(cache=True)
+def _finger_gun_check(pts):
+    """Finger gun predicate over a (21, 3) array of normalized landmark x, y, z"""
+    # For POV (first-person), the hand appears from the side/bottom of frame.
+    # Index finger extended forward: tip closer to camera (smaller z) than PIP,
+    # or the traditional Y extension as backup
+    index_extended = pts[8, 2] < pts[6, 2] or pts[8, 1] < pts[6, 1]
+
+    # Thumb up (perpendicular to index): lower Y than its MCP or a significant X offset
+    thumb_up = pts[4, 1] < pts[2, 1] or abs(pts[4, 0] - pts[2, 0]) > 0.08
+
+    # Middle, ring and pinky curled: tips not extending forward in Z, or Y indicates curl
+    middle_curled = pts[12, 2] >= pts[10, 2] or pts[12, 1] >= pts[10, 1]
+    ring_curled = pts[16, 2] >= pts[14, 2] or pts[16, 1] >= pts[14, 1]
+    pinky_curled = pts[20, 2] >= pts[18, 2] or pts[20, 1] >= pts[18, 1]
+
+    return index_extended and thumb_up and middle_curled and ring_curled and pinky_curled
+
+@njit(cache=True)
+def _cock_motion_step(thumb_y, prev_y, cocked, on_cooldown, threshold):
+    """Advance the cock/fire state machine by one frame; returns (shot_fired, cocked)"""
+    # Negative movement = thumb moving up/back, positive = snapping down/forward
+    movement = thumb_y - prev_y
+    shot_fired = False
+
+    if movement < -threshold and not cocked:
+        # Cocking motion (relaxed threshold for POV)
+        cocked = True
+    elif movement > threshold and cocked:
+        # Shooting motion after being cocked
+        if not on_cooldown:
+            shot_fired = True
+        cocked = False
+
+    return shot_fired, cocked
+
+# OpenCV's fixed-point division tables for 8-bit BGR2HSV (hsv_shift = 12),
+# so the fused kernel matches cvtColor + inRange bit for bit
+_HSV_SHIFT = 12
+_HSV_SDIV = np.array([0] + [round((255 << _HSV_SHIFT) / i) for i in range(1, 256)], dtype=np.int32)
+_HSV_HDIV = np.array([0] + [round((180 << _HSV_SHIFT) / (6 * i)) for i in range(1, 256)], dtype=np.int32)
+# Lowest S and V either team color accepts, for the kernel's early out
+_HSV_MIN_S = int(min(HIGHVIS_YELLOW_LOWER[1], HIGHVIS_GREEN_LOWER[1]))
+_HSV_MIN_V = int(min(HIGHVIS_YELLOW_LOWER[2], HIGHVIS_GREEN_LOWER[2]))
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _classify_hsv(bgr, out):
+    """Threshold a BGR image against the yellow/green HSV ranges in one pass.
+
+    Writes 255 into out[..., 0] for yellow pixels and out[..., 1] for green
+    ones. H, S, V are computed per pixel with the same integer table
+    arithmetic as OpenCV's 8-bit BGR2HSV, so the masks equal inRange's.
+    """
+    half = 1 << (_HSV_SHIFT - 1)
+    rows, cols = bgr.shape[0], bgr.shape[1]
+    for y in prange(rows):
+        for x in range(cols):
+            b = np.int32(bgr[y, x, 0])
+            g = np.int32(bgr[y, x, 1])
+            r = np.int32(bgr[y, x, 2])
+            out[y, x, 0] = 0
+            out[y, x, 1] = 0
+
+            v = max(r, g, b)
+            diff = v - min(r, g, b)
+            # Early out below both colors' lower bounds; each color is still checked fully
+            if v < _HSV_MIN_V:
+                continue
+            s = (diff * _HSV_SDIV[v] + half) >> _HSV_SHIFT
+            if s < _HSV_MIN_S:
+                continue
+
+            if v == r:
+                h = g - b
+            elif v == g:
+                h = b - r + 2 * diff
+            else:
+                h = r - g + 4 * diff
+            h = (h * _HSV_HDIV[diff] + half) >> _HSV_SHIFT
+            if h < 0:
+                h += 180
+
+            if (HIGHVIS_YELLOW_LOWER[0] <= h <= HIGHVIS_YELLOW_UPPER[0]
+                    and HIGHVIS_YELLOW_LOWER[1] <= s <= HIGHVIS_YELLOW_UPPER[1]
+                    and HIGHVIS_YELLOW_LOWER[2] <= v <= HIGHVIS_YELLOW_UPPER[2]):
+                out[y, x, 0] = 255
+            if (HIGHVIS_GREEN_LOWER[0] <= h <= HIGHVIS_GREEN_UPPER[0]
+                    and HIGHVIS_GREEN_LOWER[1] <= s <= HIGHVIS_GREEN_UPPER[1]
+                    and HIGHVIS_GREEN_LOWER[2] <= v <= HIGHVIS_GREEN_UPPER[2]):
+                out[y, x, 1] = 255
+
+def _as_hands_results(result):
+    """Wrap a HandLandmarkerResult in the legacy mp.solutions.hands result shape"""
+    return SimpleNamespace(
+        multi_hand_landmarks=[SimpleNamespace(landmark=landmarks) for landmarks in result.hand_landmarks],
+        multi_handedness=[
+            SimpleNamespace(classification=[SimpleNamespace(label=c[0].category_name, score=c[0].score)])
+            for c in result.handedness
+        ],
+    )
+
+def letterbox(frame, size=YOLO_IMGSZ):
+    """Resize keeping aspect ratio and pad to size x size.
+
+    Returns (image, scale, (pad_x, pad_y)) so boxes predicted on the
+    letterboxed image can be mapped back to the original frame.
+    """
+    h, w = frame.shape[:2]
+    scale = size / max(h, w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    image = cv2.copyMakeBorder(frame, pad_y, size - new_h - pad_y, pad_x, size - new_w - pad_x,
+                               cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return image, scale, (pad_x, pad_y)
+
+def configure_threads():
+    """Limit Torch/OpenCV thread pools so YOLO doesn't starve MediaPipe and capture"""
+    import torch
+
+    torch.set_num_threads(2)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op work has started
+        pass
+    cv2.setNumThreads(1)
+    if NUMBA_ENABLED:
+        # The parallel color kernel would otherwise use every core
+        import numba
+        numba.set_num_threads(2)
+
+class FrameGrabber:
+    """Reads a VideoCapture on a background thread, keeping only the newest frame.
+
+    Older frames are overwritten rather than queued, so latency stays at one
+    frame no matter how long processing takes. The reader publishes a
+    (sequence, frame) tuple with a single reference assignment, which is atomic
+    in CPython, so neither side takes a lock.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self._latest = None
+        self._seq = 0
+        self._read_seq = 0
+        self._failures = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if ret and frame is not None:
+                self._seq += 1
+                self._latest = (self._seq, frame)
+                self._failures = 0
+            else:
+                self._failures += 1
+            if not ret:
+                time.sleep(0.01)
+
+    def read(self):
+        """Take the newest unread frame (None if there isn't one) and the consecutive read failures"""
+        latest = self._latest
+        if latest is None or latest[0] == self._read_seq:
+            return None, self._failures
+        self._read_seq = latest[0]
+        return latest[1], self._failures
+
+    def stop(self):
+        """Stop the reader thread (the capture itself is left open)
+
+        Returns False if the thread is still stuck in cap.read() after the
+        timeout, in which case the capture must not be reused.
+        """
+        self._running = False
+        self._thread.join(timeout=2)
+        return not self._thread.is_alive()
+
+class PersonDetector:
+    """YOLO person detector that batches frames submitted by several players.
+
+    Frames are collected for up to tick_ms (or until max_batch are queued)
+    and run through YOLO in a single call; each caller gets a Future for
+    its own detections. With max_batch=1 frames are run as soon as they arrive.
+
+    Detections are (xyxy, conf): an (N, 4) int32 array of person boxes in
+    the submitted frame's pixel coordinates and an (N,) array of scores.
+    """
+
+    def __init__(self, max_batch=1, tick_ms=5):
+        from ultralytics import YOLO
+
+        self.max_batch = max_batch
+        self.tick = tick_ms / 1000.0
+
+        # Person detection using YOLOv8n, via the TensorRT engine if it exists.
+        # Frames are letterboxed to imgsz here, so Ultralytics' own resize is a no-op
+        self.yolo_args = {'classes': [0], 'verbose': False, 'imgsz': YOLO_IMGSZ}
+        if os.path.exists(YOLO_ENGINE):
+            self.yolo = YOLO(YOLO_ENGINE, task='detect')
+            # The engine is built for a fixed input size on the first GPU
+            self.yolo_args.update(device=0)
+        else:
+            self.yolo = YOLO(YOLO_WEIGHTS)
+
+        # Warm up so the first real frame doesn't stall on lazy init
+        self.yolo(np.zeros((YOLO_IMGSZ, YOLO_IMGSZ, 3), np.uint8), **self.yolo_args)
+
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """Queue a BGR frame for detection; returns a Future of its detections"""
+        future = concurrent.futures.Future()
+        self._requests.put((frame, future))
+        return future
+
+    def detect(self, frame):
+        """Detect persons in a frame, blocking until its batch has run"""
+        return self.submit(frame).result()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+
+            batch = [request]
+            stop = False
+            deadline = time.monotonic() + self.tick
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+
+            try:
+                boxed = [letterbox(frame) for frame, _ in batch]
+                results = self.yolo([image for image, _, _ in boxed], **self.yolo_args)
+                for (frame, future), (_, scale, (pad_x, pad_y)), result in zip(batch, boxed, results):
+                    # One device-to-host transfer per frame, then undo the letterbox
+                    xyxy = result.boxes.xyxy.cpu().numpy()
+                    conf = result.boxes.conf.cpu().numpy()
+                    xyxy -= (pad_x, pad_y, pad_x, pad_y)
+                    xyxy /= scale
+                    h, w = frame.shape[:2]
+                    np.clip(xyxy, 0, (w, h, w, h), out=xyxy)
+                    future.set_result((xyxy.astype(np.int32), conf))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+            if stop:
+                return
+
+    def close(self):
+        """Stop the batching thread once queued frames have been processed"""
+        self._requests.put(None)
+        self._thread.join()
+
 class FingerGunDetector:
-    def __init__(self, player_id=1):
+    # Index finger landmarks: 5 (MCP), 6 (PIP), 7 (DIP), 8 (tip)
+    _INDEX_POINTS = np.array([5, 6, 7, 8], np.int32)
+    # Thumb landmarks: 1 (CMC), 2 (MCP), 3 (IP), 4 (tip)
+    _THUMB_POINTS = np.array([1, 2, 3, 4], np.int32)
+
+    def __init__(self, player_id=1, render=False, person_detector=None):
         self.player_id = player_id
+        # Only draw the on-screen preview when asked; headless runs skip it
+        self.render = render
+
+        # Heavy imports are deferred until a detector is actually built
+        import mediapipe as mp
+
+        self._mp = mp
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=4,  # Detect multiple to find the closest one
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.7
-        )
         self.mp_draw = mp.solutions.drawing_utils
 
-        # Person detection using YOLOv8n
-        self.yolo = YOLO('yolov8n.pt')
+        # Prefer the Tasks HandLandmarker (LIVE_STREAM, GPU where available);
+        # its results arrive on a callback and the newest one is used per frame
+        self._hands_lock = threading.Lock()
+        self._hands_result = SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+        self._hands_ts = 0
+        self.landmarker = None
+        if os.path.exists(HAND_LANDMARKER_MODEL):
+            self.landmarker = self._create_landmarker()
+
+        self.hands = None
+        if self.landmarker is None:
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=1,  # The finger gun is one-handed
+                # Lower thresholds keep tracking alive so the slower palm
+                # detector re-runs less often after a brief tracking drop
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+
+        # Hand ROI tracking: run MediaPipe on a crop around the last hand and
+        # only fall back to a full-frame search after a few missed frames
+        self._last_bbox = None
+        self._roi_misses = 0
+        self.roi_scale = 1.6
+        self.roi_max_misses = 3
+
+        # Reusable landmark buffers (normalized xyz and pixel xy) for the hot loop
+        self._lm_scratch = np.empty((21, 3), dtype=np.float32)
+        self._lm_px_scratch = np.empty((21, 2), dtype=np.int32)
+        # Hand (and frame size) currently held in the buffers, so repeat lookups are free
+        self._lm_owner = None
+        self._lm_px_size = None
+        # RGB copy of the frame for MediaPipe, reused while the frame size is unchanged
+        self._rgb_buf = None
+
+        # Shot effect: muzzle flash rings drawn once, line overlay sized on first shot
+        self._muzzle_flash = np.zeros((80, 80, 3), dtype=np.uint8)
+        for radius in [15, 25, 35]:
+            cv2.circle(self._muzzle_flash, (40, 40), radius, (0, 255, 255), 2)
+        self._shot_overlay = None
+        # Person detection cadence in preview mode; cached boxes are redrawn in between
+        self.yolo_period = 3
+        self._yolo_tick = -1
+        self._last_person_boxes = []
+
+        # Crosshair is static, so it is rendered once and stamped each frame
+        self._crosshair_patch = None
+        self._crosshair_mask = None
+
+        # HUD glyph atlas: (char, scale, thickness) -> (mask, top offset, advance)
+        self._glyphs = {}
+        for ch in set("0123456789 Yellow: | Green:"):
+            self._glyph(ch, 0.7, 2)
+        for ch in set("0123456789 Streak: ACE!"):
+            self._glyph(ch, 0.8, 2)
+
+        # Person detection, optionally shared (and batched) with other players.
+        # Only preview mode draws person boxes, so headless runs skip loading it
+        self._owns_person_detector = person_detector is None and render
+        self.person_detector = person_detector
+        if self._owns_person_detector:
+            self.person_detector = PersonDetector()
+
+        # Compile the gesture checks and the color kernel (for whole frames and for
+        # box slices of them) so the first hand doesn't stall on JIT compilation
+        if NUMBA_ENABLED:
+            _finger_gun_check(np.zeros((21, 3), np.float32))
+            _cock_motion_step(0.0, 0.0, False, False, 0.0)
+            scratch = np.zeros((4, 4, 3), np.uint8)
+            _classify_hsv(scratch, np.empty((4, 4, 2), np.uint8))
+            _classify_hsv(scratch[:, :2], np.empty((4, 2, 2), np.uint8))
+
+        # Warm up MediaPipe so the first real frame doesn't stall on lazy init
+        if self.hands is not None:
+            self.hands.process(np.zeros((480, 640, 3), np.uint8))
 
         # Directory to save shot images
         self.save_dir = os.path.dirname(os.path.abspath(__file__))
         self.shots_dir = os.path.join(self.save_dir, 'shots')
         os.makedirs(self.shots_dir, exist_ok=True)
+        self._shots_prefix = self.shots_dir + os.sep
+
+        # Background hit analysis (batched) and a pool for writing shot images to disk
+        self._shot_queue = queue.Queue()
+        self._shot_thread = threading.Thread(target=self._run_shots, daemon=True)
+        self._shot_thread.start()
+        self.io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
         # Track thumb position for cocking detection
         self.prev_thumb_y = {}  # Store previous thumb Y position for each hand
@@ -80,6 +512,36 @@ class FingerGunDetector:
         if SOUND_ENABLED:
             self._load_sounds()
 
+    def _create_landmarker(self):
+        """Build a LIVE_STREAM HandLandmarker, trying the GPU delegate first on Linux"""
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        delegates = [BaseOptions.Delegate.CPU]
+        if sys.platform.startswith('linux'):
+            delegates.insert(0, BaseOptions.Delegate.GPU)
+
+        for delegate in delegates:
+            options = vision.HandLandmarkerOptions(
+                base_options=BaseOptions(model_asset_path=HAND_LANDMARKER_MODEL, delegate=delegate),
+                running_mode=vision.RunningMode.LIVE_STREAM,
+                num_hands=1,  # The finger gun is one-handed
+                min_hand_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+                result_callback=self._on_hands,
+            )
+            try:
+                return vision.HandLandmarker.create_from_options(options)
+            except Exception as e:
+                print(f"HandLandmarker {delegate.name} delegate unavailable: {e}")
+
+        print("Falling back to legacy MediaPipe Hands")
+        return None
+
+    def _on_hands(self, result, output_image, timestamp_ms):
+        """HandLandmarker callback: keep the newest result for process_frame"""
+        with self._hands_lock:
+            self._hands_result = _as_hands_results(result)
+
     def _load_sounds(self):
         """Load kill streak sound files"""
         sounds_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sounds')
@@ -141,64 +603,22 @@ class FingerGunDetector:
         return tip.y < pip.y
 
     def is_finger_gun(self, hand_landmarks):
-        landmarks = hand_landmarks.landmark
-
-        # For POV (first-person), the hand appears from the side/bottom of frame
-        # Index finger should be pointing forward (away from camera)
-        index_tip = landmarks[8]
-        index_pip = landmarks[6]
-        index_mcp = landmarks[5]
-        wrist = landmarks[0]
-
-        # Index finger extended forward (towards camera/screen)
-        # Check if index is extended using Z-depth (closer to camera = smaller z)
-        index_extended = index_tip.z < index_pip.z
-
-        # Also check traditional Y extension as backup
-        index_extended_y = index_tip.y < index_pip.y
-        index_extended = index_extended or index_extended_y
-
-        # Thumb should be up (perpendicular to index)
-        thumb_tip = landmarks[4]
-        thumb_mcp = landmarks[2]
-
-        # For POV, thumb up means lower Y value OR significant X offset
-        thumb_up = thumb_tip.y < thumb_mcp.y or abs(thumb_tip.x - thumb_mcp.x) > 0.08
-
-        # Check if middle, ring, and pinky fingers are curled
-        # For POV, curled means tips are not extending forward in Z
-        middle_tip = landmarks[12]
-        middle_pip = landmarks[10]
-        ring_tip = landmarks[16]
-        ring_pip = landmarks[14]
-        pinky_tip = landmarks[20]
-        pinky_pip = landmarks[18]
-
-        # Fingers curled if not extending forward or if Y values indicate curl
-        middle_curled = middle_tip.z >= middle_pip.z or middle_tip.y >= middle_pip.y
-        ring_curled = ring_tip.z >= ring_pip.z or ring_tip.y >= ring_pip.y
-        pinky_curled = pinky_tip.z >= pinky_pip.z or pinky_tip.y >= pinky_pip.y
-
-        # Finger gun: index extended forward, thumb up, others curled
-        return index_extended and thumb_up and middle_curled and ring_curled and pinky_curled
-
-    def get_finger_direction(self, landmarks, frame_shape):
+        return bool(_finger_gun_check(self._landmarks_to_array(hand_landmarks)))
+
+    def get_finger_direction(self, hand_landmarks, frame_shape):
         h, w, _ = frame_shape
 
-        # For FPV: Use wrist, MCP (base of index), and fingertip to calculate 3D direction
-        wrist = landmarks[0]
-        mcp = landmarks[5]   # Base of index finger
-        pip = landmarks[6]   # Middle joint of index
-        tip = landmarks[8]   # Fingertip
+        # For FPV: Use MCP (5, base of index) and fingertip (8) to calculate 3D direction
+        lm = self._landmarks_to_array(hand_landmarks)
+        lm_px = self._landmarks_to_px(hand_landmarks, w, h)
 
-        # Convert to pixel coordinates
-        tip_x, tip_y = int(tip.x * w), int(tip.y * h)
-        mcp_x, mcp_y = int(mcp.x * w), int(mcp.y * h)
+        # Pixel coordinates
+        tip_x, tip_y = int(lm_px[8, 0]), int(lm_px[8, 1])
+        mcp_x, mcp_y = int(lm_px[5, 0]), int(lm_px[5, 1])
 
         # Calculate 3D direction vector from MCP to tip
-        dx_3d = tip.x - mcp.x
-        dy_3d = tip.y - mcp.y
-        dz_3d = tip.z - mcp.z  # Negative Z = pointing toward camera/forward
+        # (negative Z = pointing toward camera/forward)
+        dx_3d, dy_3d, dz_3d = (lm[8] - lm[5]).tolist()
 
         # For FPV, when finger points forward (into screen), Z is dominant
         # We need to project the 3D vector onto the 2D screen
@@ -229,12 +649,8 @@ class FingerGunDetector:
         return tip_x, tip_y, dx, dy
 
     def detect_cock_motion(self, hand_landmarks, hand_id):
-        landmarks = hand_landmarks.landmark
-        thumb_tip = landmarks[4]
-
-        # For POV, track thumb movement in both Y (up/down) and Z (forward/back)
-        current_thumb_y = thumb_tip.y
-        current_thumb_z = thumb_tip.z
+        # For POV, track thumb tip movement in Y (up/down)
+        current_thumb_y = float(self._landmarks_to_array(hand_landmarks)[4, 1])
         current_time = time.time()
 
         # Initialize tracking for this hand if not exists
@@ -247,104 +663,151 @@ class FingerGunDetector:
         time_since_last_shot = current_time - self.last_shot_time
         on_cooldown = time_since_last_shot < self.shot_cooldown
 
-        # Calculate thumb movement (negative Y = moving up, positive Y = moving down)
-        # For POV cocking: thumb pulls back (higher Y or similar) then snaps forward (lower Y)
-        thumb_movement = current_thumb_y - self.prev_thumb_y[hand_id]
-
-        shot_fired = False
-
-        # Detect cocking motion (thumb moves back/up)
-        # Relaxed threshold for POV - any upward or backward motion
-        if thumb_movement < -self.cock_threshold and not self.is_cocked[hand_id]:
-            self.is_cocked[hand_id] = True
-
-        # Detect shooting motion (thumb snaps forward/down after being cocked)
-        elif thumb_movement > self.cock_threshold and self.is_cocked[hand_id]:
-            if not on_cooldown:
-                shot_fired = True
-                self.last_shot_time = current_time
-            self.is_cocked[hand_id] = False
+        shot_fired, self.is_cocked[hand_id] = _cock_motion_step(
+            current_thumb_y, self.prev_thumb_y[hand_id], self.is_cocked[hand_id],
+            on_cooldown, self.cock_threshold
+        )
+        if shot_fired:
+            self.last_shot_time = current_time
 
         # Update previous position
         self.prev_thumb_y[hand_id] = current_thumb_y
 
         return shot_fired
 
+    def _landmarks_to_array(self, hand_landmarks):
+        """Return the hand's normalized landmarks as a (21, 3) array, converting once per hand"""
+        if hand_landmarks is not self._lm_owner:
+            self._lm_scratch[:] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+            self._lm_owner = hand_landmarks
+            self._lm_px_size = None
+        return self._lm_scratch
+
+    def _landmarks_to_px(self, hand_landmarks, w, h):
+        """Return the hand's landmarks as (21, 2) pixel coords, reusing the scratch buffers"""
+        lm = self._landmarks_to_array(hand_landmarks)
+        if self._lm_px_size != (w, h):
+            np.multiply(lm[:, :2], (w, h), out=self._lm_px_scratch, casting='unsafe')
+            self._lm_px_size = (w, h)
+        return self._lm_px_scratch
+
     def draw_trigger_skeleton(self, frame, hand_landmarks):
         """Draw only the index finger and thumb (trigger mechanism)"""
-        landmarks = hand_landmarks.landmark
         h, w, _ = frame.shape
 
-        # Index finger landmarks: 5 (MCP), 6 (PIP), 7 (DIP), 8 (tip)
-        index_points = [5, 6, 7, 8]
-        # Thumb landmarks: 1 (CMC), 2 (MCP), 3 (IP), 4 (tip)
-        thumb_points = [1, 2, 3, 4]
-        # Wrist for connection
-        wrist = 0
-
         # Convert landmarks to pixel coordinates
-        def get_point(idx):
-            lm = landmarks[idx]
-            return (int(lm.x * w), int(lm.y * h))
-
-        # Draw index finger
-        for i in range(len(index_points) - 1):
-            pt1 = get_point(index_points[i])
-            pt2 = get_point(index_points[i + 1])
-            cv2.line(frame, pt1, pt2, (0, 255, 0), 3)
-            cv2.circle(frame, pt1, 4, (0, 255, 0), -1)
-        cv2.circle(frame, get_point(index_points[-1]), 4, (0, 255, 0), -1)
-
-        # Draw thumb
-        for i in range(len(thumb_points) - 1):
-            pt1 = get_point(thumb_points[i])
-            pt2 = get_point(thumb_points[i + 1])
-            cv2.line(frame, pt1, pt2, (255, 0, 0), 3)
-            cv2.circle(frame, pt1, 4, (255, 0, 0), -1)
-        cv2.circle(frame, get_point(thumb_points[-1]), 4, (255, 0, 0), -1)
+        lm_px = self._landmarks_to_px(hand_landmarks, w, h)
+
+        index_pts = lm_px[self._INDEX_POINTS]
+        thumb_pts = lm_px[self._THUMB_POINTS]
+
+        # Draw each finger as a single polyline, then its joints
+        cv2.polylines(frame, [index_pts], False, (0, 255, 0), 3)
+        cv2.polylines(frame, [thumb_pts], False, (255, 0, 0), 3)
+        for x, y in index_pts:
+            cv2.circle(frame, (int(x), int(y)), 4, (0, 255, 0), -1)
+        for x, y in thumb_pts:
+            cv2.circle(frame, (int(x), int(y)), 4, (255, 0, 0), -1)
 
         # Connect wrist to index MCP and thumb CMC
-        wrist_pt = get_point(wrist)
-        cv2.line(frame, wrist_pt, get_point(5), (0, 255, 0), 2)
-        cv2.line(frame, wrist_pt, get_point(1), (255, 0, 0), 2)
+        wrist_pt = (int(lm_px[0, 0]), int(lm_px[0, 1]))
+        cv2.polylines(frame, [lm_px[[0, 5]]], False, (0, 255, 0), 2)
+        cv2.polylines(frame, [lm_px[[0, 1]]], False, (255, 0, 0), 2)
         cv2.circle(frame, wrist_pt, 5, (255, 255, 255), -1)
 
     def draw_crosshair(self, frame):
         """Draw a crosshair in the center of the screen"""
+        if self._crosshair_patch is None:
+            self._build_crosshair()
+        patch, mask = self._crosshair_patch, self._crosshair_mask
+
+        # Stamp the prerendered crosshair onto the center of the frame
         h, w, _ = frame.shape
-        center_x, center_y = w // 2, h // 2
+        half = patch.shape[0] // 2
+        x0, y0 = w // 2 - half, h // 2 - half
+        roi = frame[y0:y0 + patch.shape[0], x0:x0 + patch.shape[1]]
+        if roi.shape == patch.shape:
+            np.copyto(roi, patch, where=mask)
+
+    def _build_crosshair(self):
+        """Render the crosshair once into a small patch plus its pixel mask"""
         size = 20
         gap = 5
+        half = gap + size + 2
+        center_x = center_y = half
+        patch = np.zeros((2 * half + 1, 2 * half + 1, 3), dtype=np.uint8)
 
         # Draw crosshair lines with gap in center
         color = (0, 255, 255)  # Cyan
         thickness = 2
 
         # Top
-        cv2.line(frame, (center_x, center_y - gap - size), (center_x, center_y - gap), color, thickness)
+        cv2.line(patch, (center_x, center_y - gap - size), (center_x, center_y - gap), color, thickness)
         # Bottom
-        cv2.line(frame, (center_x, center_y + gap), (center_x, center_y + gap + size), color, thickness)
+        cv2.line(patch, (center_x, center_y + gap), (center_x, center_y + gap + size), color, thickness)
         # Left
-        cv2.line(frame, (center_x - gap - size, center_y), (center_x - gap, center_y), color, thickness)
+        cv2.line(patch, (center_x - gap - size, center_y), (center_x - gap, center_y), color, thickness)
         # Right
-        cv2.line(frame, (center_x + gap, center_y), (center_x + gap + size, center_y), color, thickness)
+        cv2.line(patch, (center_x + gap, center_y), (center_x + gap + size, center_y), color, thickness)
 
         # Center dot
-        cv2.circle(frame, (center_x, center_y), 2, color, -1)
+        cv2.circle(patch, (center_x, center_y), 2, color, -1)
+
+        self._crosshair_patch = patch
+        self._crosshair_mask = patch.any(axis=2, keepdims=True)
+
+    def _glyph(self, ch, scale, thickness):
+        """Rasterize one HUD character once and cache its mask"""
+        key = (ch, scale, thickness)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            (w, h), baseline = cv2.getTextSize(ch, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+            scratch = np.zeros((h + baseline + 2 * thickness, w + 2 * thickness), dtype=np.uint8)
+            cv2.putText(scratch, ch, (thickness, h + thickness),
+                       cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+            glyph = (scratch > 0, h + thickness, w)
+            self._glyphs[key] = glyph
+        return glyph
+
+    def draw_hud(self, frame):
+        """Draw the team counts and kill streak onto the frame"""
+        h, w = frame.shape[:2]
+
+        # Draw team count on screen
+        self._blit_text(frame, f"Yellow: {self.yellow_count} | Green: {self.green_count}",
+                        w - 300, 30, (255, 255, 255), 0.7, 2)
+
+        # Draw kill streak
+        if self.kill_streak > 0:
+            streak_text = f"Streak: {self.kill_streak}" + (" ACE!" if self.kill_streak >= 5 else "")
+            self._blit_text(frame, streak_text, 10, h - 20, (0, 255, 255), 0.8, 2)
+
+    def _blit_text(self, frame, text, x, y, color, scale=0.7, thickness=2):
+        """Draw text from the glyph atlas; (x, y) is the baseline origin like cv2.putText"""
+        fh, fw = frame.shape[:2]
+        for ch in text:
+            mask, top, advance = self._glyph(ch, scale, thickness)
+            gx, gy = x - thickness, y - top
+            gh, gw = mask.shape
+            # Clip the glyph against the frame edges
+            cx0, cy0 = max(0, -gx), max(0, -gy)
+            cx1, cy1 = min(gw, fw - gx), min(gh, fh - gy)
+            if cx1 > cx0 and cy1 > cy0:
+                frame[gy + cy0:gy + cy1, gx + cx0:gx + cx1][mask[cy0:cy1, cx0:cx1]] = color
+            x += advance
 
     def get_hand_bbox(self, hand_landmarks, frame_shape):
         """Get bounding box of the hand"""
         h, w, _ = frame_shape
-        landmarks = hand_landmarks.landmark
-
-        x_coords = [int(lm.x * w) for lm in landmarks]
-        y_coords = [int(lm.y * h) for lm in landmarks]
+        lm_px = self._landmarks_to_px(hand_landmarks, w, h)
+        mins = lm_px.min(axis=0)
+        maxs = lm_px.max(axis=0)
 
         padding = 30
-        x_min = max(0, min(x_coords) - padding)
-        x_max = min(w, max(x_coords) + padding)
-        y_min = max(0, min(y_coords) - padding)
-        y_max = min(h, max(y_coords) + padding)
+        x_min = max(0, int(mins[0]) - padding)
+        x_max = min(w, int(maxs[0]) + padding)
+        y_min = max(0, int(mins[1]) - padding)
+        y_max = min(h, int(maxs[1]) + padding)
 
         return (x_min, y_min, x_max, y_max)
 
@@ -359,70 +822,120 @@ class FingerGunDetector:
         if not hand_landmarks_list:
             return None, -1
 
-        max_size = 0
-        closest_idx = 0
+        if len(hand_landmarks_list) == 1:
+            return hand_landmarks_list[0], 0
 
-        for idx, hand_landmarks in enumerate(hand_landmarks_list):
-            size = self.get_hand_size(hand_landmarks, frame_shape)
-            if size > max_size:
-                max_size = size
-                closest_idx = idx
+        sizes = np.array([self.get_hand_size(hand_landmarks, frame_shape)
+                          for hand_landmarks in hand_landmarks_list])
+        closest_idx = int(np.argmax(sizes))
 
         return hand_landmarks_list[closest_idx], closest_idx
 
     def save_shot(self, frame, hand_bbox=None):
-        """Save the current frame when a shot is fired"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"shot_{timestamp}.jpg"
-        filepath = os.path.join(self.shots_dir, filename)
-        cv2.imwrite(filepath, frame)
-        print(f"Shot saved: {filepath}")
+        """Queue the current frame for hit analysis and a background disk write"""
+        filepath = f"{self._shots_prefix}shot_{time.time_ns()}.jpg"
+        # Only preview mode keeps drawing on this frame; headless, the grabber hands
+        # out a fresh buffer per frame, so the background work can share it
+        shot_frame = frame.copy() if self.render else frame
+        self.io_pool.submit(self._write_shot, filepath, shot_frame)
+        # Analysis gets the frame in memory, so it never waits on the JPEG round-trip
+        self._shot_queue.put((shot_frame, hand_bbox))
         return filepath, hand_bbox
 
-    def boxes_overlap(self, box1, box2, threshold=0.3):
-        """Check if two bounding boxes overlap significantly"""
-        x1_1, y1_1, x2_1, y2_1 = box1
-        x1_2, y1_2, x2_2, y2_2 = box2
+    def _write_shot(self, filepath, frame):
+        """Write the shot to disk (runs on the IO pool)"""
+        if cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 85]):
+            print(f"Shot saved: {filepath}")
+        else:
+            print(f"Error saving shot: {filepath}")
+
+    def _run_shots(self):
+        """Score queued shots in small batches and update the streak"""
+        # Load the shot model (and compile its hit gate) on this thread, where
+        # every shot is scored, rather than on the first shot
+        try:
+            warm_up_analyzer(self.player_id)
+        except Exception as e:
+            print(f"Error warming up shot analyzer: {e}")
+
+        while True:
+            shot = self._shot_queue.get()
+            if shot is None:
+                return
+
+            # Take whatever else is already queued, without waiting for more
+            batch = [shot]
+            stop = False
+            while len(batch) < SHOT_BATCH_MAX:
+                try:
+                    shot = self._shot_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if shot is None:
+                    stop = True
+                    break
+                batch.append(shot)
+
+            try:
+                hits = analyze_shots([frame for frame, _ in batch],
+                                     [hand_bbox for _, hand_bbox in batch],
+                                     [self.player_id] * len(batch))
+                # Handle hits in firing order and play sounds
+                for is_valid_hit in hits:
+                    self.on_hit(is_valid_hit)
+            except Exception as e:
+                print(f"Error analyzing shot: {e}")
 
-        # Calculate intersection
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
+            if stop:
+                return
 
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return False
+    def boxes_overlap(self, hand_boxes, boxes, threshold=0.3):
+        """Mask of boxes (N, 4) that significantly overlap any hand box (M, 4)"""
+        # Broadcast to an (N, M) intersection grid of every box against every hand
+        xi1 = np.maximum(boxes[:, None, 0], hand_boxes[None, :, 0])
+        yi1 = np.maximum(boxes[:, None, 1], hand_boxes[None, :, 1])
+        xi2 = np.minimum(boxes[:, None, 2], hand_boxes[None, :, 2])
+        yi2 = np.minimum(boxes[:, None, 3], hand_boxes[None, :, 3])
 
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
+        intersection = np.clip(xi2 - xi1, 0, None) * np.clip(yi2 - yi1, 0, None)
+        area_hand = (hand_boxes[:, 2] - hand_boxes[:, 0]) * (hand_boxes[:, 3] - hand_boxes[:, 1])
 
-        if area1 > 0 and intersection / area1 > threshold:
-            return True
-        return False
+        return (intersection / np.maximum(area_hand, 1) > threshold).any(axis=1)
 
     def detect_color_masks(self, frame):
         """Detect regions with yellow and green colors separately."""
+        if NUMBA_ENABLED:
+            # One fused pass writes both masks as channels, so morphology runs once
+            mask = np.empty(frame.shape[:2] + (2,), dtype=np.uint8)
+            _classify_hsv(frame, mask)
+            mask = cv2.dilate(cv2.erode(mask, MORPH_KERNEL), GROW_KERNEL)
+            mask_yellow, mask_green = cv2.split(mask)
+            return mask_yellow, mask_green
+
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
 
         mask_yellow = cv2.inRange(hsv, HIGHVIS_YELLOW_LOWER, HIGHVIS_YELLOW_UPPER)
         mask_green = cv2.inRange(hsv, HIGHVIS_GREEN_LOWER, HIGHVIS_GREEN_UPPER)
 
-        kernel = np.ones((5, 5), np.uint8)
+        # Open removes speckle, one dilate joins the vest; no close pass needed
+        # since classification only needs >3% coverage of the torso.
+        # Fused as erode + one larger dilate (see GROW_KERNEL)
+        mask_yellow = cv2.dilate(cv2.erode(mask_yellow, MORPH_KERNEL), GROW_KERNEL)
+        mask_green = cv2.dilate(cv2.erode(mask_green, MORPH_KERNEL), GROW_KERNEL)
 
-        # Process yellow mask
-        mask_yellow = cv2.morphologyEx(mask_yellow, cv2.MORPH_OPEN, kernel)
-        mask_yellow = cv2.morphologyEx(mask_yellow, cv2.MORPH_CLOSE, kernel)
-        mask_yellow = cv2.dilate(mask_yellow, kernel, iterations=2)
+        return mask_yellow, mask_green
 
-        # Process green mask
-        mask_green = cv2.morphologyEx(mask_green, cv2.MORPH_OPEN, kernel)
-        mask_green = cv2.morphologyEx(mask_green, cv2.MORPH_CLOSE, kernel)
-        mask_green = cv2.dilate(mask_green, kernel, iterations=2)
+    def _box_count(self, integral, x1, y1, x2, y2):
+        """Number of set (255) mask pixels in [y1:y2, x1:x2] from its integral image"""
+        total = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+        return int(total) // 255
 
-        return mask_yellow, mask_green
+    def classify_person_team(self, frame, x1, y1, x2, y2, ii_yellow, ii_green):
+        """Classify what color team a person is on: yellow, green, or None.
 
-    def classify_person_team(self, frame, x1, y1, x2, y2, mask_yellow, mask_green):
-        """Classify what color team a person is on: yellow, green, or None."""
+        ii_yellow / ii_green are integral images of the color masks, so the
+        torso counts are four lookups each regardless of box size.
+        """
         w, h = x2 - x1, y2 - y1
 
         # Focus on upper body / torso area (where vest would be)
@@ -434,105 +947,112 @@ class FingerGunDetector:
         end_y = min(frame.shape[0], upper_y + upper_h)
         end_x = min(frame.shape[1], x2)
 
-        roi_yellow = mask_yellow[upper_y:end_y, upper_x:end_x]
-        roi_green = mask_green[upper_y:end_y, upper_x:end_x]
-
-        if roi_yellow.size == 0:
+        if end_y <= upper_y or end_x <= upper_x:
             return None
 
-        yellow_pixels = cv2.countNonZero(roi_yellow)
-        green_pixels = cv2.countNonZero(roi_green)
-        total_pixels = roi_yellow.size
-
-        yellow_pct = (yellow_pixels / total_pixels) * 100
-        green_pct = (green_pixels / total_pixels) * 100
-
-        yellow_valid = yellow_pct > 3 and yellow_pixels > MIN_HIGHVIS_AREA
-        green_valid = green_pct > 3 and green_pixels > MIN_HIGHVIS_AREA
+        yellow_pixels = self._box_count(ii_yellow, upper_x, upper_y, end_x, end_y)
+        green_pixels = self._box_count(ii_green, upper_x, upper_y, end_x, end_y)
+        total_pixels = (end_y - upper_y) * (end_x - upper_x)
 
-        if yellow_valid and green_valid:
-            return "yellow" if yellow_pixels > green_pixels else "green"
-        elif yellow_valid:
-            return "yellow"
-        elif green_valid:
-            return "green"
-        else:
+        # A color counts if it covers >3% of the torso and enough pixels; the
+        # strongest valid color wins (green first so a tie goes to green)
+        counts = np.array([green_pixels, yellow_pixels])
+        valid = (counts > MIN_HIGHVIS_AREA) & (counts * 100 > 3 * total_pixels)
+        if not valid.any():
             return None
-
-    def detect_and_draw_person(self, frame, hand_bboxes):
-        """Detect person using YOLOv8n and draw bounding box only for yellow/green team members"""
-        # Run YOLO inference (class 0 = person)
-        results = self.yolo(frame, classes=[0], verbose=False)
+        return ("green", "yellow")[int(np.argmax(counts))]
+
+    def detect_persons(self, frame, hand_bboxes, detections=None):
+        """Detect persons with YOLOv8n and classify their team.
+
+        Returns a list of (x1, y1, x2, y2, team, confidence) and updates the
+        yellow/green counts.
+        """
+        # Run YOLO inference (class 0 = person) unless it was already run
+        if detections is None:
+            detections = self.person_detector.detect(frame)
+        xyxy, confs = detections
         person_boxes = []
 
-        # Get color masks for team classification
-        mask_yellow, mask_green = self.detect_color_masks(frame)
-
         # Reset counts
         self.yellow_count = 0
         self.green_count = 0
 
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get bounding box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                confidence = box.conf[0].cpu().numpy()
-                person_box = (x1, y1, x2, y2)
-                w, h = x2 - x1, y2 - y1
-
-                # Skip if this person box overlaps with any detected hand
-                is_hand = False
-                for hand_bbox in hand_bboxes:
-                    if self.boxes_overlap(hand_bbox, person_box):
-                        is_hand = True
-                        break
+        hand_arr = np.asarray(hand_bboxes, dtype=np.int32).reshape(-1, 4)
+
+        # Drop person boxes that overlap with any detected hand
+        keep = ~self.boxes_overlap(hand_arr, xyxy)
+        persons = [(int(x1), int(y1), int(x2), int(y2), confidence)
+                   for (x1, y1, x2, y2), confidence in zip(xyxy[keep], confs[keep])]
+
+        # No people in view: skip color masks entirely
+        if not persons:
+            return person_boxes
+
+        # Get color masks for team classification, only over the union of person boxes
+        frame_h, frame_w = frame.shape[:2]
+        ux1 = max(0, min(d[0] for d in persons))
+        uy1 = max(0, min(d[1] for d in persons))
+        ux2 = min(frame_w, max(d[2] for d in persons))
+        uy2 = min(frame_h, max(d[3] for d in persons))
+        union = frame[uy1:uy2, ux1:ux2]
+        if union.size == 0:
+            return person_boxes
+        mask_yellow, mask_green = self.detect_color_masks(union)
+        ii_yellow = cv2.integral(mask_yellow, sdepth=cv2.CV_32S)
+        ii_green = cv2.integral(mask_green, sdepth=cv2.CV_32S)
+
+        for x1, y1, x2, y2, confidence in persons:
+            # Classify team (coordinates relative to the union ROI)
+            team = self.classify_person_team(union, x1 - ux1, y1 - uy1, x2 - ux1, y2 - uy1,
+                                             ii_yellow, ii_green)
+
+            # No color detected = green team
+            if team is None:
+                team = "green"
+
+            if team == "yellow":
+                self.yellow_count += 1
+            else:
+                self.green_count += 1
 
-                if is_hand:
-                    continue
-
-                # Classify team
-                team = self.classify_person_team(frame, x1, y1, x2, y2, mask_yellow, mask_green)
-
-                # No color detected = green team
-                if team is None:
-                    team = "green"
-
-                if team == "yellow":
-                    color = (0, 255, 255)  # Yellow in BGR
-                    label = "YELLOW"
-                    self.yellow_count += 1
-                else:  # green
-                    color = (0, 255, 0)  # Green in BGR
-                    label = "GREEN"
-                    self.green_count += 1
-
-                # Store bounding box with team info
-                person_boxes.append((x1, y1, x2, y2, team))
-
-                # Draw bounding box
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-                # Draw corner accents
-                corner_len = min(20, w // 4, h // 4)
-                cv2.line(frame, (x1, y1), (x1 + corner_len, y1), color, 4)
-                cv2.line(frame, (x1, y1), (x1, y1 + corner_len), color, 4)
-                cv2.line(frame, (x2, y1), (x2 - corner_len, y1), color, 4)
-                cv2.line(frame, (x2, y1), (x2, y1 + corner_len), color, 4)
-                cv2.line(frame, (x1, y2), (x1 + corner_len, y2), color, 4)
-                cv2.line(frame, (x1, y2), (x1, y2 - corner_len), color, 4)
-                cv2.line(frame, (x2, y2), (x2 - corner_len, y2), color, 4)
-                cv2.line(frame, (x2, y2), (x2, y2 - corner_len), color, 4)
-
-                # Draw label with confidence
-                label_text = f"{label} {int(confidence * 100)}%"
-                label_size, _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
-                cv2.rectangle(frame, (x1, y1 - 25), (x1 + label_size[0] + 10, y1), color, -1)
-                cv2.putText(frame, label_text, (x1 + 5, y1 - 7),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+            # Store bounding box with team info
+            person_boxes.append((x1, y1, x2, y2, team, confidence))
 
         return person_boxes
 
+    def _draw_boxes(self, frame, person_boxes):
+        """Draw team-colored boxes, corner accents and labels for detected persons"""
+        for x1, y1, x2, y2, team, confidence in person_boxes:
+            w, h = x2 - x1, y2 - y1
+
+            if team == "yellow":
+                color = (0, 255, 255)  # Yellow in BGR
+                label = "YELLOW"
+            else:  # green
+                color = (0, 255, 0)  # Green in BGR
+                label = "GREEN"
+
+            # Draw bounding box
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+            # Draw corner accents (four L-shapes in one call)
+            c = min(20, w // 4, h // 4)
+            corners = np.array([
+                [(x1 + c, y1), (x1, y1), (x1, y1 + c)],
+                [(x2 - c, y1), (x2, y1), (x2, y1 + c)],
+                [(x1 + c, y2), (x1, y2), (x1, y2 - c)],
+                [(x2 - c, y2), (x2, y2), (x2, y2 - c)],
+            ], dtype=np.int32)
+            cv2.polylines(frame, list(corners), False, color, 4)
+
+            # Draw label with confidence
+            label_text = f"{label} {int(confidence * 100)}%"
+            label_size, _ = cv2.getTextSize(label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            cv2.rectangle(frame, (x1, y1 - 25), (x1 + label_size[0] + 10, y1), color, -1)
+            cv2.putText(frame, label_text, (x1 + 5, y1 - 7),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+
     def draw_vector(self, frame, start_x, start_y, dx, dy, length=300):
         # Calculate end point of vector
         end_x = int(start_x + dx * length)
@@ -561,24 +1081,119 @@ class FingerGunDetector:
         cv2.circle(frame, (start_x, start_y), 12, (0, 200, 200), 2)
 
     def draw_shot_effect(self, frame, start_x, start_y, dx, dy):
-        # Draw multiple shot lines with varying opacity for effect
+        # Draw all shot lines into one overlay and add it onto the frame in a single pass
+        if self._shot_overlay is None or self._shot_overlay.shape != frame.shape:
+            self._shot_overlay = np.zeros_like(frame)
+        else:
+            self._shot_overlay.fill(0)
+
         for i in range(5):
             length = 500 + i * 50
             end_x = int(start_x + dx * length)
             end_y = int(start_y + dy * length)
             thickness = max(1, 5 - i)
-            cv2.line(frame, (start_x, start_y), (end_x, end_y), (0, 100 + i * 30, 255), thickness)
+            cv2.line(self._shot_overlay, (start_x, start_y), (end_x, end_y), (0, 100 + i * 30, 255), thickness)
+        cv2.add(frame, self._shot_overlay, dst=frame)
+
+        # Blend the prerendered muzzle flash around the fingertip, clipped to the frame
+        h, w = frame.shape[:2]
+        half = self._muzzle_flash.shape[0] // 2
+        x0, y0 = max(0, start_x - half), max(0, start_y - half)
+        x1, y1 = min(w, start_x + half), min(h, start_y + half)
+        if x1 <= x0 or y1 <= y0:
+            return
 
-        # Draw muzzle flash
-        for radius in [15, 25, 35]:
-            alpha = 255 - (radius * 5)
-            cv2.circle(frame, (start_x, start_y), radius, (0, 255, 255), 2)
+        sx, sy = x0 - (start_x - half), y0 - (start_y - half)
+        sprite = self._muzzle_flash[sy:sy + (y1 - y0), sx:sx + (x1 - x0)]
+        frame[y0:y1, x0:x1] = cv2.addWeighted(frame[y0:y1, x0:x1], 1.0, sprite, 0.8, 0)
+
+    def _hand_roi(self, w, h):
+        """Padded crop (x1, y1, x2, y2) around the last tracked hand"""
+        x1, y1, x2, y2 = self._last_bbox
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        half_w = (x2 - x1) * self.roi_scale / 2
+        half_h = (y2 - y1) * self.roi_scale / 2
+        return (max(0, int(cx - half_w)), max(0, int(cy - half_h)),
+                min(w, int(cx + half_w)), min(h, int(cy + half_h)))
+
+    def _remap_landmarks(self, results, roi, w, h):
+        """Convert landmarks normalized to the ROI back to full-frame normalized coords"""
+        x1, y1, x2, y2 = roi
+        roi_w, roi_h = x2 - x1, y2 - y1
+        for hand_landmarks in results.multi_hand_landmarks:
+            for lm in hand_landmarks.landmark:
+                lm.x = (x1 + lm.x * roi_w) / w
+                lm.y = (y1 + lm.y * roi_h) / h
+                lm.z = lm.z * roi_w / w
+
+    def _tracking_ok(self, results):
+        """True if a hand was found with a confident handedness score"""
+        return bool(results.multi_hand_landmarks) and (
+            not results.multi_handedness
+            or results.multi_handedness[0].classification[0].score >= 0.5
+        )
+
+    def detect_hands(self, rgb_frame):
+        """Run MediaPipe hands, cropping to the previous hand when it is being tracked"""
+        if self.landmarker is not None:
+            # The Tasks landmarker tracks the hand ROI itself; submit the frame and
+            # use the newest result delivered so far (timestamps must increase)
+            self._hands_ts = max(int(time.monotonic() * 1000), self._hands_ts + 1)
+            image = self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=rgb_frame)
+            self.landmarker.detect_async(image, self._hands_ts)
+            with self._hands_lock:
+                return self._hands_result
+
+        h, w = rgb_frame.shape[:2]
+
+        if self._last_bbox is not None:
+            roi = self._hand_roi(w, h)
+            x1, y1, x2, y2 = roi
+            if x2 > x1 and y2 > y1:
+                results = self.hands.process(np.ascontiguousarray(rgb_frame[y1:y2, x1:x2]))
+                if results.multi_hand_landmarks:
+                    self._remap_landmarks(results, roi, w, h)
+                if self._tracking_ok(results):
+                    self._roi_misses = 0
+                    self._last_bbox = self.get_hand_bbox(results.multi_hand_landmarks[0], rgb_frame.shape)
+                    return results
+
+                self._roi_misses += 1
+                if self._roi_misses < self.roi_max_misses:
+                    # Hand may just be blurred; keep searching the crop for now
+                    return results
+            self._last_bbox = None
+
+        # Full-frame search (palm detection over the whole image)
+        results = self.hands.process(rgb_frame)
+        self._roi_misses = 0
+        if self._tracking_ok(results):
+            self._last_bbox = self.get_hand_bbox(results.multi_hand_landmarks[0], rgb_frame.shape)
+        return results
 
     def process_frame(self, frame):
         # Don't flip for POV mode - Ray-Bans show natural perspective
         # frame = cv2.flip(frame, 1)  # Disabled for POV
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
+        yolo_future = None
+        if self.render:
+            # Refresh person boxes every yolo_period frames; YOLO only needs the hand
+            # boxes for filtering, so start it before MediaPipe (it runs on the
+            # person detector's thread; both release the GIL)
+            self._yolo_tick += 1
+            if self._yolo_tick % self.yolo_period == 0:
+                yolo_future = self.person_detector.submit(frame)
+
+        # Hands run on a working-resolution copy (YOLO letterboxes the full frame itself)
+        h, w = frame.shape[:2]
+        small = frame
+        if w > HANDS_MAX_WIDTH:
+            small = cv2.resize(frame, (HANDS_MAX_WIDTH, round(h * HANDS_MAX_WIDTH / w)),
+                               interpolation=cv2.INTER_AREA)
+
+        if self._rgb_buf is None or self._rgb_buf.shape != small.shape:
+            self._rgb_buf = np.empty_like(small)
+        rgb_frame = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        results = self.detect_hands(rgb_frame)
 
         finger_gun_detected = False
         shot_fired = False
@@ -592,34 +1207,45 @@ class FingerGunDetector:
             closest_hand, closest_idx = self.get_closest_hand(
                 results.multi_hand_landmarks, frame.shape
             )
-            if closest_hand:
+            if closest_hand and self.render:
                 hand_bbox = self.get_hand_bbox(closest_hand, frame.shape)
                 hand_bboxes.append(hand_bbox)
 
-        # Detect and draw bounding box around person (excluding the closest hand)
-        self.detect_and_draw_person(frame, hand_bboxes)
+        # Check for finger gun gesture on the closest hand
+        has_hand = closest_hand is not None and bool(results.multi_handedness)
+        if has_hand:
+            finger_gun_detected = self.is_finger_gun(closest_hand)
+
+        if self.render:
+            # A raised finger gun (including any shot frame) always gets fresh boxes
+            if yolo_future is None and finger_gun_detected:
+                yolo_future = self.person_detector.submit(frame)
+            if yolo_future is not None:
+                # Detect persons, excluding the closest hand
+                self._last_person_boxes = self.detect_persons(frame, hand_bboxes, yolo_future.result())
+            # Otherwise redraw the last boxes
+            self._draw_boxes(frame, self._last_person_boxes)
 
-        # Always draw crosshair in center
-        self.draw_crosshair(frame)
+            # Always draw crosshair in center
+            self.draw_crosshair(frame)
 
         # Only process the closest hand
-        if closest_hand is not None and results.multi_handedness:
+        if has_hand:
             hand_landmarks = closest_hand
             handedness = results.multi_handedness[closest_idx]
             hand_id = handedness.classification[0].label
 
             # Only draw index finger and thumb (the "trigger" parts)
-            self.draw_trigger_skeleton(frame, hand_landmarks)
-
-            # Check for finger gun gesture
-            if self.is_finger_gun(hand_landmarks):
-                finger_gun_detected = True
+            if self.render:
+                self.draw_trigger_skeleton(frame, hand_landmarks)
 
+            if finger_gun_detected:
                 # Get finger tip position and direction
-                tip_x, tip_y, dx, dy = self.get_finger_direction(
-                    hand_landmarks.landmark,
-                    frame.shape
-                )
+                if self.render:
+                    tip_x, tip_y, dx, dy = self.get_finger_direction(
+                        hand_landmarks,
+                        frame.shape
+                    )
 
                 # Detect cocking motion
                 is_shot = self.detect_cock_motion(hand_landmarks, hand_id)
@@ -630,16 +1256,14 @@ class FingerGunDetector:
                     self.play_pew_sound()
                     # Get hand bounding box to exclude from person detection
                     hand_bbox = self.get_hand_bbox(hand_landmarks, frame.shape)
-                    # Save the shot image and analyze it
-                    filepath, hand_bbox = self.save_shot(frame, hand_bbox)
-                    is_valid_hit = analyze_shot(filepath, hand_bbox, self.player_id)
-                    # Handle hit and play sound
-                    self.on_hit(is_valid_hit)
-                    # Draw shot effect
-                    self.draw_shot_effect(frame, tip_x, tip_y, dx, dy)
-                    cv2.putText(frame, "BANG!", (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 4)
-                else:
+                    # Save the shot image and analyze it off the main loop
+                    self.save_shot(frame, hand_bbox)
+                    if self.render:
+                        # Draw shot effect
+                        self.draw_shot_effect(frame, tip_x, tip_y, dx, dy)
+                        cv2.putText(frame, "BANG!", (10, 30),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 4)
+                elif self.render:
                     # Show cocked status with POV-friendly text
                     if hand_id in self.is_cocked and self.is_cocked[hand_id]:
                         cv2.putText(frame, "READY", (10, 60),
@@ -651,7 +1275,16 @@ class FingerGunDetector:
         return frame, shot_fired
 
     def release(self):
-        self.hands.close()
+        if self._owns_person_detector:
+            self.person_detector.close()
+        if self.landmarker is not None:
+            self.landmarker.close()
+        else:
+            self.hands.close()
+        # Let pending shots finish before the directory is cleared
+        self._shot_queue.put(None)
+        self._shot_thread.join()
+        self.io_pool.shutdown(wait=True)
         self._clear_shots_directory()
 
     def _clear_shots_directory(self):
@@ -672,8 +1305,16 @@ def main():
     parser = argparse.ArgumentParser(description='Finger Gun Game')
     parser.add_argument('--player', '-p', type=int, default=1, choices=[1, 2],
                         help='Player number (1 or 2)')
+    parser.add_argument('--preview', action='store_true',
+                        help='Show the annotated video preview window')
+    parser.add_argument('--export-engine', action='store_true',
+                        help=f'Export {YOLO_WEIGHTS} to a TensorRT engine ({os.path.basename(YOLO_ENGINE)}) and exit')
     args = parser.parse_args()
 
+    if args.export_engine:
+        export_engine()
+        return
+
     player_id = args.player
     rtmp_port = 1935 if player_id == 1 else 1937
 
@@ -683,11 +1324,13 @@ def main():
     print("\nHold your hand in a finger gun gesture")
     print("Pull your thumb back to cock, release forward to shoot")
     print("Teams: GREEN = High-Vis | BLUE = Regular")
-    print("Press 'Q' to quit")
+    print("Press 'Q' to quit" if args.preview else "Press Ctrl+C to quit")
     print("=" * 50)
 
+    configure_threads()
+
     # Initialize detector
-    detector = FingerGunDetector(player_id=player_id)
+    detector = FingerGunDetector(player_id=player_id, render=args.preview)
 
     # Get local IP and set up RTMP
     local_ip = get_local_ip()
@@ -706,100 +1349,80 @@ def main():
     # Set FFMPEG options for low latency (same as ffplay flags)
     os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "fflags;nobuffer|flags;low_delay|framedrop;1|strict;experimental"
     
-    # Keep trying to connect until stream is available
-    cap = None
-    while cap is None:
-        # Use FFMPEG backend explicitly with low-latency options
-        cap = cv2.VideoCapture(rtmp_url, cv2.CAP_FFMPEG)
-        
-        if cap.isOpened():
-            # Set additional buffer properties
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            ret, test_frame = cap.read()
-            if ret and test_frame is not None:
-                print(f"\n✓ Connected to RTMP stream!")
-                break
-            else:
-                cap.release()
-                cap = None
-        
+    # Keep trying to connect until stream is available; the same capture is
+    # reopened on every attempt and on reconnects
+    cap = cv2.VideoCapture()
+    while not open_stream(cap, rtmp_url):
         print(".", end="", flush=True)
         time.sleep(2)
+    print(f"\n✓ Connected to RTMP stream!")
     
     print("\nProcessing frames...")
 
-    consecutive_failures = 0
     max_failures = 30  # Reconnect after this many failed frames
 
-    while True:
-        ret, frame = cap.read()
+    # Read on a background thread so decoding never queues up behind processing
+    grabber = FrameGrabber(cap)
 
-        if not ret or frame is None:
-            consecutive_failures += 1
-
-            if consecutive_failures >= max_failures:
-                print("\nStream disconnected. Attempting to reconnect...")
-                cap.release()
-
-                # Reconnect loop
-                cap = None
-                while cap is None:
-                    cap = cv2.VideoCapture(rtmp_url, cv2.CAP_FFMPEG)
-
-                    if cap.isOpened():
-                        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                        ret, test_frame = cap.read()
-                        if ret and test_frame is not None:
+    try:
+        while True:
+            frame, consecutive_failures = grabber.read()
+
+            if frame is None:
+                if consecutive_failures >= max_failures:
+                    print("\nStream disconnected. Attempting to reconnect...")
+                    if not grabber.stop():
+                        # The old reader is still blocked in cap.read(); leave it that
+                        # capture (it's freed once the read returns) and use a new one
+                        cap = cv2.VideoCapture()
+
+                    # Reconnect loop
+                    connected = False
+                    while not connected:
+                        connected = open_stream(cap, rtmp_url)
+                        if connected:
                             print("✓ Reconnected!")
-                            consecutive_failures = 0
                             break
-                        else:
-                            cap.release()
-                            cap = None
-
-                    print(".", end="", flush=True)
-                    time.sleep(2)
 
-                    # Check for quit during reconnect
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        cap = None
-                        break
+                        print(".", end="", flush=True)
+                        time.sleep(2)
 
-                if cap is None:
-                    break
+                        # Check for quit during reconnect
+                        if args.preview and cv2.waitKey(1) & 0xFF == ord('q'):
+                            break
 
-            time.sleep(0.01)
-            continue
+                    if not connected:
+                        break
+                    grabber = FrameGrabber(cap)
 
-        # Reset failure counter on successful frame
-        consecutive_failures = 0
+                # Wait for the next frame
+                time.sleep(0.005)
+                continue
 
-        # Process frame
-        processed_frame, shot_fired = detector.process_frame(frame)
+            # Process frame
+            processed_frame, shot_fired = detector.process_frame(frame)
 
-        # Draw team count on screen
-        h, w = processed_frame.shape[:2]
-        cv2.putText(processed_frame, f"Yellow: {detector.yellow_count} | Green: {detector.green_count}",
-                   (w - 300, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            if not args.preview:
+                continue
 
-        # Draw kill streak
-        if detector.kill_streak > 0:
-            streak_text = f"Streak: {detector.kill_streak}" + (" ACE!" if detector.kill_streak >= 5 else "")
-            cv2.putText(processed_frame, streak_text, (10, h - 20),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+            # Draw team counts and kill streak
+            detector.draw_hud(processed_frame)
 
-        # Display frame
-        cv2.imshow(f'Finger Gun Game - Player {player_id}', processed_frame)
+            # Display frame
+            cv2.imshow(f'Finger Gun Game - Player {player_id}', processed_frame)
 
-        # Check for quit
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            # Check for quit
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        pass
 
-    # Cleanup
-    if cap is not None:
+    # Cleanup (a reader still blocked in cap.read() keeps its capture; it's freed
+    # once the read returns)
+    if grabber.stop():
         cap.release()
-    cv2.destroyAllWindows()
+    if args.preview:
+        cv2.destroyAllWindows()
     detector.release()
     print("\nGame ended. Thanks for playing!")
 
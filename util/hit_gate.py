@@ -0,0 +1,56 @@
+import torch
+from torch import nn
+from torchvision.ops import nms
+
+
+class HitGate(nn.Module):
+    """Frame -> decoded person boxes and scores, as one fixed-shape Torch graph.
+
+    Runs the YOLOv8 detection model plus the tensor part of Ultralytics'
+    postprocess: boxes are converted to xyxy, and an anchor keeps a score only
+    if person is its best class and that score beats conf (the stock
+    classes=[0] filter). NMS has a data-dependent output size, so it runs
+    eagerly afterwards in nms_boxes.
+    """
+
+    def __init__(self, model, conf=0.25):
+        super().__init__()
+        self.model = model
+        self.conf = conf
+
+    def forward(self, x):
+        """
+        Args:
+            x: (B, 3, H, W) letterboxed RGB input in [0, 1]
+
+        Returns:
+            (boxes, scores): (B, A, 4) xyxy per anchor and (B, A) person scores
+            (zero where the anchor isn't a confident person)
+        """
+        preds = self.model(x)
+        if isinstance(preds, (list, tuple)):
+            preds = preds[0]
+
+        # (B, 4 + classes, anchors): xywh boxes, then per-class scores (0 = person)
+        xc, yc, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        boxes = torch.stack((xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2), dim=2)
+
+        best_score, best_cls = preds[:, 4:].max(dim=1)
+        person = (best_cls == 0) & (best_score > self.conf)
+        scores = torch.where(person, best_score, torch.zeros_like(best_score))
+        return boxes, scores
+
+
+def nms_boxes(boxes, scores, count, iou=0.7, max_det=300):
+    """Stock-equivalent NMS over HitGate output for the first count images.
+
+    Returns one (K, 4) xyxy tensor per image, ordered by descending score like
+    Ultralytics' results.
+    """
+    kept = []
+    for i in range(count):
+        candidates = scores[i] > 0
+        image_boxes, image_scores = boxes[i][candidates], scores[i][candidates]
+        keep = nms(image_boxes, image_scores, iou)[:max_det]
+        kept.append(image_boxes[keep])
+    return kept
@@ -1,7 +1,12 @@
+import concurrent.futures
+import os
+import shutil
+import threading
+
 import cv2
 import numpy as np
 import requests
-from ultralytics import YOLO
+from requests.adapters import HTTPAdapter
 
 # API endpoint for hit registration
 HITS_API_URL = "https://gobbler-working-bluebird.ngrok-free.app/api/hits"
@@ -13,71 +18,102 @@ PLAYER_CONFIG = {
 }
 
 # High-vis color ranges in HSV (same as finger_gun_detector)
-HIGHVIS_YELLOW_LOWER = np.array([20, 100, 100])
-HIGHVIS_YELLOW_UPPER = np.array([45, 255, 255])
+HIGHVIS_YELLOW_LOWER = np.array([20, 100, 100], dtype=np.uint8)
+HIGHVIS_YELLOW_UPPER = np.array([45, 255, 255], dtype=np.uint8)
 
-HIGHVIS_ORANGE_LOWER = np.array([5, 150, 150])
-HIGHVIS_ORANGE_UPPER = np.array([20, 255, 255])
+HIGHVIS_ORANGE_LOWER = np.array([5, 150, 150], dtype=np.uint8)
+HIGHVIS_ORANGE_UPPER = np.array([20, 255, 255], dtype=np.uint8)
 
-HIGHVIS_GREEN_LOWER = np.array([45, 100, 100])
-HIGHVIS_GREEN_UPPER = np.array([75, 255, 255])
+HIGHVIS_GREEN_LOWER = np.array([45, 100, 100], dtype=np.uint8)
+HIGHVIS_GREEN_UPPER = np.array([75, 255, 255], dtype=np.uint8)
 
 MIN_HIGHVIS_AREA = 500
 
+# Torso color coverage is measured on every Nth pixel in each direction
+COLOR_SAMPLE_STEP = 4
+
 # User is on REGULAR team (not wearing high-vis)
 USER_TEAM = "regular"
 
+# Shot scoring only needs a rough person box around the crosshair, so YOLO
+# runs at a reduced input size (boxes come back in original-frame coordinates)
+SHOT_IMGSZ = 320
+
+# The hit gate is compiled for this one batch size: the game loop scores one
+# shot at a time (1 s cooldown, one player per process), so bursts are rare and
+# are fed through it shot by shot rather than padded or recompiled
+GATE_BATCH = 1
+
+# Exported shot models (built by export_shot_model), preferred over the .pt weights
+# (they live next to this script, whatever the working directory)
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+SHOT_WEIGHTS = 'yolov8n.pt'
+SHOT_ENGINE = os.path.join(MODEL_DIR, 'yolov8n_shot.engine')
+SHOT_OPENVINO = os.path.join(MODEL_DIR, 'yolov8n_openvino_model')
+
+# YOLO model shared by every analyzer, loaded on first use, and its call arguments
+_YOLO = None
+_YOLO_ARGS = {'classes': [0], 'verbose': False}
+# Whether the loaded model runs on CUDA (decided once, in _load_yolo)
+_ON_CUDA = False
+# Pinned host buffer for uploading letterboxed shots, reused across calls
+_PINNED = None
+# Compiled HitGate (see hit_gate.py); False once it's known to be unavailable
+_GATE = None
+# Guards model loading/inference (shots may be analyzed from several threads)
+_YOLO_LOCK = threading.Lock()
+
+# player_id -> ShotAnalyzer, reused across shots, and the lock around get-or-create
+_ANALYZER_CACHE = {}
+_ANALYZER_LOCK = threading.Lock()
+
 
 class ShotAnalyzer:
-    def __init__(self, player_id=1):
-        self.yolo = YOLO('yolov8n.pt')
+    def __init__(self, player_id=1, imgsz=SHOT_IMGSZ):
+        global _YOLO
+        with _YOLO_LOCK:
+            if _YOLO is None:
+                _YOLO = _load_yolo()
+        self.yolo = _YOLO
+        self.imgsz = imgsz
+        self._center_shape = None
+        self._center = None
         self.player_id = player_id
         self.username, self.target_team = PLAYER_CONFIG.get(player_id, ("unknown", "yellow"))
 
-    def boxes_overlap(self, box1, box2, threshold=0.3):
-        """Check if two bounding boxes overlap significantly."""
-        x1_1, y1_1, x2_1, y2_1 = box1
-        x1_2, y1_2, x2_2, y2_2 = box2
+        # Hits are posted off the scoring path over a kept-alive connection
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+        self._session.headers.update({
+            "ngrok-skip-browser-warning": "true",
+            "Content-Type": "application/json"
+        })
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
+    def boxes_overlap(self, box1, boxes, threshold=0.3):
+        """Mask of boxes (N, 4) that significantly overlap the hand box box1."""
+        x1_1, y1_1, x2_1, y2_1 = box1
 
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return False
+        x1_i = np.maximum(boxes[:, 0], x1_1)
+        y1_i = np.maximum(boxes[:, 1], y1_1)
+        x2_i = np.minimum(boxes[:, 2], x2_1)
+        y2_i = np.minimum(boxes[:, 3], y2_1)
 
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
+        # Clamp to zero where the boxes don't intersect
+        intersection = np.maximum(x2_i - x1_i, 0) * np.maximum(y2_i - y1_i, 0)
         area_hand = (x2_1 - x1_1) * (y2_1 - y1_1)
 
-        if area_hand > 0 and intersection / area_hand > threshold:
-            return True
-
-        return False
-
-    def detect_color_masks(self, frame):
-        """Detect regions with specific high-visibility colors."""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-        mask_yellow = cv2.inRange(hsv, HIGHVIS_YELLOW_LOWER, HIGHVIS_YELLOW_UPPER)
-        mask_green = cv2.inRange(hsv, HIGHVIS_GREEN_LOWER, HIGHVIS_GREEN_UPPER)
-
-        kernel = np.ones((5, 5), np.uint8)
-
-        # Process yellow mask
-        mask_yellow = cv2.morphologyEx(mask_yellow, cv2.MORPH_OPEN, kernel)
-        mask_yellow = cv2.morphologyEx(mask_yellow, cv2.MORPH_CLOSE, kernel)
-        mask_yellow = cv2.dilate(mask_yellow, kernel, iterations=2)
+        if area_hand <= 0:
+            return np.zeros(len(boxes), dtype=bool)
 
-        # Process green mask
-        mask_green = cv2.morphologyEx(mask_green, cv2.MORPH_OPEN, kernel)
-        mask_green = cv2.morphologyEx(mask_green, cv2.MORPH_CLOSE, kernel)
-        mask_green = cv2.dilate(mask_green, kernel, iterations=2)
+        return intersection / area_hand > threshold
 
-        return mask_yellow, mask_green
+    def classify_person_team(self, frame, x1, y1, x2, y2):
+        """Classify what color team a person is on: yellow, green, or none.
 
-    def classify_person_team(self, frame, x1, y1, x2, y2, mask_yellow, mask_green):
-        """Classify what color team a person is on: yellow, green, or none."""
+        Only the torso ROI is converted and thresholded, without morphology;
+        the coverage percentage is what decides the team.
+        """
         w, h = x2 - x1, y2 - y1
 
         upper_y = y1 + int(h * 0.15)
@@ -88,18 +124,26 @@ class ShotAnalyzer:
         end_y = min(frame.shape[0], upper_y + upper_h)
         end_x = min(frame.shape[1], x2)
 
-        roi_yellow = mask_yellow[upper_y:end_y, upper_x:end_x]
-        roi_green = mask_green[upper_y:end_y, upper_x:end_x]
-
-        if roi_yellow.size == 0:
+        roi_bgr = frame[upper_y:end_y, upper_x:end_x]
+        if roi_bgr.size == 0:
             return None
 
-        yellow_pixels = cv2.countNonZero(roi_yellow)
-        green_pixels = cv2.countNonZero(roi_green)
-        total_pixels = roi_yellow.size
+        # Coverage is robust to sparse sampling, so only every Nth pixel is checked
+        step = COLOR_SAMPLE_STEP
+        roi_hsv = cv2.cvtColor(roi_bgr[::step, ::step], cv2.COLOR_BGR2HSV)
+        roi_yellow = cv2.inRange(roi_hsv, HIGHVIS_YELLOW_LOWER, HIGHVIS_YELLOW_UPPER)
+        roi_green = cv2.inRange(roi_hsv, HIGHVIS_GREEN_LOWER, HIGHVIS_GREEN_UPPER)
+
+        yellow_sampled = cv2.countNonZero(roi_yellow)
+        green_sampled = cv2.countNonZero(roi_green)
+        total_sampled = roi_yellow.size
 
-        yellow_pct = (yellow_pixels / total_pixels) * 100
-        green_pct = (green_pixels / total_pixels) * 100
+        yellow_pct = (yellow_sampled / total_sampled) * 100
+        green_pct = (green_sampled / total_sampled) * 100
+
+        # Scale sampled counts back up to estimated full-ROI pixel counts
+        yellow_pixels = yellow_sampled * step * step
+        green_pixels = green_sampled * step * step
 
         # Check if enough pixels to count as wearing that color
         yellow_valid = yellow_pct > 3 and yellow_pixels > MIN_HIGHVIS_AREA
@@ -116,94 +160,378 @@ class ShotAnalyzer:
             return None
 
     def send_hit_to_api(self):
-        """Send hit data to the API endpoint."""
+        """Record a hit with the API in the background; returns a Future of success."""
         payload = {
             "hitter_username": self.username,
             "target_team": self.target_team
         }
-        headers = {
-            "ngrok-skip-browser-warning": "true",
-            "Content-Type": "application/json"
-        }
+        return self._executor.submit(self._post_hit, payload)
+
+    def _post_hit(self, payload):
+        """POST hit data to the API endpoint (runs on the hit executor)."""
         try:
-            response = requests.post(HITS_API_URL, json=payload, headers=headers, timeout=5)
+            response = self._session.post(HITS_API_URL, json=payload, timeout=5)
             print(f"API Response: {response.status_code} - {response.text}")
             return response.status_code == 200
         except Exception as e:
             print(f"API Error: {e}")
             return False
 
-    def is_valid_hit(self, image_path, hand_bbox=None):
+    def is_valid_hit_frame(self, frame, hand_bbox=None):
         """
-        Analyze a shot image to check if the crosshair hit the target team.
+        Analyze a shot frame to check if the crosshair hit the target team.
 
         Player 1 (Phil) targets yellow team
         Player 2 (Kevin) targets green team
 
         Args:
-            image_path: Path to the saved shot image
+            frame: BGR frame (np.ndarray), e.g. the live frame handed over by the game loop
             hand_bbox: (x1, y1, x2, y2) bounding box of the FPV hand to exclude
 
         Returns:
             bool: True if hit target team, False if miss or wrong team
         """
-        frame = cv2.imread(image_path)
+        target = _find_targets([self], [frame], [hand_bbox], self.imgsz)[0]
+        return self.judge_target(frame, target)
+
+    def is_valid_hit(self, image_path, hand_bbox=None):
+        """Fallback for saved shots: load the image (or take a frame as-is) and analyze it."""
+        frame = _load_frame(image_path)
         if frame is None:
-            print(f"Error: Could not load image {image_path}")
+            return False
+        return self.is_valid_hit_frame(frame, hand_bbox)
+
+    def analyze_batch(self, frames, hand_bboxes=None):
+        """Check several shots with one YOLO call; returns a list of hit booleans."""
+        if hand_bboxes is None:
+            hand_bboxes = [None] * len(frames)
+        if not frames:
+            return []
+
+        targets = _find_targets([self] * len(frames), frames, hand_bboxes, self.imgsz)
+        return [self.judge_target(frame, target) for frame, target in zip(frames, targets)]
+
+    def judge_target(self, frame, target):
+        """Decide whether the person box under the crosshair (or None) is a valid hit."""
+        # Nothing under the crosshair: no color work at all
+        if target is None:
+            print("HIT: False (missed)")
             return False
 
-        h, w, _ = frame.shape
-        center_x, center_y = w // 2, h // 2
+        # Classify only the person under the crosshair
+        person_team = self.classify_person_team(frame, *target)
 
-        # Get color masks for team classification
-        mask_yellow, mask_green = self.detect_color_masks(frame)
+        # No high-vis color detected = green team
+        if person_team is None:
+            person_team = "green"
 
-        # Detect persons in the image
-        results = self.yolo(frame, classes=[0], verbose=False)
+        # Valid hit only if person is wearing our target team's color
+        if person_team == self.target_team:
+            print(f"HIT: True ({self.username} hit {person_team.upper()} team - valid target!)")
+            # Send hit to API
+            self.send_hit_to_api()
+            return True
 
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy().astype(int)
-                person_box = (x1, y1, x2, y2)
-
-                # Skip if this person box overlaps with the FPV hand
-                if hand_bbox is not None and self.boxes_overlap(hand_bbox, person_box):
-                    continue
-
-                # Check if crosshair is within bounding box
-                if x1 <= center_x <= x2 and y1 <= center_y <= y2:
-                    # Classify the person's team color
-                    person_team = self.classify_person_team(frame, x1, y1, x2, y2, mask_yellow, mask_green)
-
-                    # No high-vis color detected = green team
-                    if person_team is None:
-                        person_team = "green"
-
-                    # Valid hit only if person is wearing our target team's color
-                    if person_team == self.target_team:
-                        print(f"HIT: True ({self.username} hit {person_team.upper()} team - valid target!)")
-                        # Send hit to API
-                        self.send_hit_to_api()
-                        return True
-                    else:
-                        print(f"HIT: False ({self.username} hit {person_team.upper()} - wrong team, target is {self.target_team.upper()})")
-                        return False
-
-        print("HIT: False (missed)")
+        print(f"HIT: False ({self.username} hit {person_team.upper()} - wrong team, target is {self.target_team.upper()})")
         return False
 
+    def _crosshair_center(self, frame_shape):
+        """Crosshair (frame center) for a frame shape, cached since the stream resolution is fixed."""
+        if self._center_shape != frame_shape[:2]:
+            h, w = frame_shape[:2]
+            self._center_shape = frame_shape[:2]
+            self._center = (w // 2, h // 2)
+        return self._center
 
-def analyze_shot(image_path, hand_bbox=None, player_id=1):
-    """Convenience function to analyze a single shot"""
-    analyzer = ShotAnalyzer(player_id=player_id)
-    return analyzer.is_valid_hit(image_path, hand_bbox)
+    def find_target(self, results, center_x, center_y, hand_bbox=None, transform=None):
+        """First person box (x1, y1, x2, y2) containing the crosshair, or None."""
+        for result in results:
+            target = self.pick_target(result.boxes.xyxy, center_x, center_y, hand_bbox, transform)
+            if target is not None:
+                return target
+        return None
+
+    def pick_target(self, xyxy, center_x, center_y, hand_bbox=None, transform=None):
+        """First of the score-ordered boxes (N, 4) containing the crosshair, or None.
+
+        transform is the (scale, (pad_x, pad_y)) letterbox the boxes are in, or
+        None when they are already in frame coordinates.
+        """
+        if transform is not None:
+            # Test against the letterboxed boxes with the crosshair mapped into them
+            scale, (pad_x, pad_y) = transform
+            box_cx, box_cy = round(center_x * scale + pad_x), round(center_y * scale + pad_y)
+        else:
+            box_cx, box_cy = center_x, center_y
+
+        # Keep the boxes on the model's device as int32 for the crosshair test
+        xyxy = xyxy.int()
+
+        # Crosshair-in-box test over every box at once: OR-ing the four signed
+        # differences leaves the sign bit set if any one of them is negative
+        inside = ((box_cx - xyxy[:, 0]) | (xyxy[:, 2] - box_cx) |
+                  (box_cy - xyxy[:, 1]) | (xyxy[:, 3] - box_cy)) >= 0
+
+        # One device-to-host transfer, of only the boxes under the crosshair
+        candidates = xyxy[inside].cpu().numpy()
+        if transform is not None and len(candidates):
+            # Undo the letterbox for the few remaining boxes
+            candidates = ((candidates - (pad_x, pad_y, pad_x, pad_y)) / scale).astype(np.int32)
+
+        # Skip boxes that overlap with the FPV hand
+        if hand_bbox is not None and len(candidates):
+            candidates = candidates[~self.boxes_overlap(hand_bbox, candidates)]
+
+        if len(candidates):
+            x1, y1, x2, y2 = candidates[0].tolist()
+            return x1, y1, x2, y2
+
+        return None
+
+
+def _load_yolo():
+    """Load the fastest available shot model: TensorRT engine, OpenVINO IR, then .pt"""
+    global _ON_CUDA
+    # Deferred so importing this module doesn't pull in Torch
+    import torch
+    from ultralytics import YOLO
+
+    if os.path.exists(SHOT_ENGINE):
+        # The engine is FP16 at SHOT_IMGSZ on the first GPU
+        _YOLO_ARGS.update(device=0)
+        _ON_CUDA = True
+        return YOLO(SHOT_ENGINE, task='detect')
+    if os.path.isdir(SHOT_OPENVINO):
+        # OpenVINO runs on the CPU
+        _ON_CUDA = False
+        return YOLO(SHOT_OPENVINO, task='detect')
+    _ON_CUDA = torch.cuda.is_available()
+    model = YOLO(SHOT_WEIGHTS)
+    if _ON_CUDA:
+        # Put the weights on the GPU up front, and fuse them now so the
+        # predictor's own fuse is a no-op and can't invalidate the hit gate
+        model.to('cuda')
+        model.fuse()
+        _YOLO_ARGS.update(device=0)
+    return model
+
+
+def export_shot_model(fmt='engine', batch=4):
+    """Export the shot model once: FP16 TensorRT engine on NVIDIA, OpenVINO IR on CPU
+
+    Exports at SHOT_IMGSZ with a dynamic batch so analyze_shots can score a burst.
+    """
+    from ultralytics import YOLO
+
+    if fmt == 'engine':
+        # Export from a copy of the weights with the shot engine's stem, so the
+        # output lands in SHOT_ENGINE and the person detector's full-size
+        # yolov8n.engine is never written
+        stem_weights = os.path.splitext(SHOT_ENGINE)[0] + '.pt'
+        shutil.copyfile(YOLO(SHOT_WEIGHTS).ckpt_path, stem_weights)
+        try:
+            YOLO(stem_weights).export(format='engine', half=True, imgsz=SHOT_IMGSZ,
+                                      dynamic=True, batch=batch)
+        finally:
+            os.remove(stem_weights)
+    else:
+        path = YOLO(SHOT_WEIGHTS).export(format='openvino', imgsz=SHOT_IMGSZ, dynamic=True)
+        # The IR is written next to the weights; move it to where it's loaded from
+        if os.path.abspath(path) != SHOT_OPENVINO:
+            shutil.rmtree(SHOT_OPENVINO, ignore_errors=True)
+            shutil.move(path, SHOT_OPENVINO)
+
+
+def _letterbox_into(frame, out):
+    """Resize frame into the square buffer out, keeping aspect and padding with gray
+
+    Returns (scale, (pad_x, pad_y)) to map letterboxed coordinates back to the frame.
+    """
+    size = out.shape[0]
+    h, w = frame.shape[:2]
+    scale = min(size / w, size / h)
+    new_w, new_h = round(w * scale), round(h * scale)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    out[:] = 114
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return scale, (pad_x, pad_y)
+
+
+def _to_input(frames, imgsz):
+    """Model input for frames, plus each frame's letterbox transform.
+
+    When the model runs on CUDA, frames are letterboxed into one reused pinned
+    host buffer and uploaded as a single RGB [0, 1] batch, so YOLO skips its
+    own per-call allocation and copy. Otherwise (CPU torch, OpenVINO) the
+    frames are passed through unchanged (transforms are None). Callers hold
+    _YOLO_LOCK, which guards the buffer.
+    """
+    global _PINNED
+    if not _ON_CUDA:
+        return list(frames), [None] * len(frames)
+
+    n = len(frames)
+    if _PINNED is None or _PINNED.shape[0] < n or _PINNED.shape[1] != imgsz:
+        import torch
+        _PINNED = torch.empty((n, imgsz, imgsz, 3), dtype=torch.uint8).pin_memory()
+    host = _PINNED[:n].numpy()
+    transforms = [_letterbox_into(frame, host[i]) for i, frame in enumerate(frames)]
+
+    batch = _PINNED[:n].to('cuda', non_blocking=True)
+    # NHWC BGR uint8 -> NCHW RGB float, as Ultralytics expects tensor inputs
+    # (contiguous, so the compiled gate's stride guards match its warm-up input)
+    batch = batch.permute(0, 3, 1, 2).flip(1).float().div_(255).contiguous()
+    return batch, transforms
+
+
+def _load_gate():
+    """Compiled HitGate over the shared PyTorch model on CUDA, or None
+
+    Compiles for the one fixed GATE_BATCH x SHOT_IMGSZ input shape and runs
+    it a few times so CUDA graph capture is done before any real shot (on the
+    calling thread, which must be the one that scores shots).
+    Callers hold _YOLO_LOCK.
+    """
+    global _GATE
+    if _GATE is None:
+        _GATE = False
+        if not _ON_CUDA:
+            return None
+        try:
+            import torch
+            from hit_gate import HitGate
+
+            # Exported engines/IR have no nn.Module to compile
+            if not isinstance(_YOLO.model, torch.nn.Module):
+                return None
+            gate = torch.compile(HitGate(_YOLO.model.eval()), mode='reduce-overhead', dynamic=False)
+            warmup = torch.zeros((GATE_BATCH, 3, SHOT_IMGSZ, SHOT_IMGSZ), device='cuda')
+            for _ in range(3):
+                gate(warmup)
+            torch.cuda.synchronize()
+            _GATE = gate
+        except Exception as e:
+            print(f"Hit gate unavailable: {e}")
+    return _GATE or None
+
+
+def _gate_targets(gate, analyzers, frames, hand_bboxes, inputs, transforms):
+    """Person box under each frame's crosshair via the compiled gate and eager NMS"""
+    from hit_gate import nms_boxes
+
+    targets = []
+    for start in range(0, len(frames), GATE_BATCH):
+        chunk = inputs[start:start + GATE_BATCH]
+        boxes, scores = gate(chunk)
+        kept = nms_boxes(boxes, scores, len(chunk))
+
+        for j, xyxy in enumerate(kept):
+            i = start + j
+            analyzer, frame = analyzers[i], frames[i]
+            targets.append(analyzer.pick_target(xyxy, *analyzer._crosshair_center(frame.shape),
+                                                hand_bboxes[i], transforms[i]))
+    return targets
+
+
+def _find_targets(analyzers, frames, hand_bboxes, imgsz):
+    """Person box under each frame's crosshair (or None) from one batched model call.
+
+    Uses the compiled HitGate when it's available, and the stock Ultralytics
+    postprocess otherwise (or if the gate fails to compile).
+    """
+    global _GATE
+    # The shared model and pinned buffer aren't safe to use concurrently
+    with _YOLO_LOCK:
+        inputs, transforms = _to_input(frames, imgsz)
+        # The gate is compiled for SHOT_IMGSZ inputs only
+        gate = _load_gate() if transforms[0] is not None and imgsz == SHOT_IMGSZ else None
+        if gate is not None:
+            try:
+                return _gate_targets(gate, analyzers, frames, hand_bboxes, inputs, transforms)
+            except Exception as e:
+                print(f"Hit gate failed, using the standard postprocess: {e}")
+                _GATE = False
+        results = _YOLO(inputs, imgsz=imgsz, **_YOLO_ARGS)
+
+    return [analyzer.find_target([result], *analyzer._crosshair_center(frame.shape), hand_bbox, transform)
+            for analyzer, frame, result, hand_bbox, transform
+            in zip(analyzers, frames, results, hand_bboxes, transforms)]
+
+
+def _load_frame(image):
+    """Return a BGR frame for an ndarray or an image path (None if it can't be read)"""
+    if isinstance(image, np.ndarray):
+        return image
+    frame = cv2.imread(image)
+    if frame is None:
+        print(f"Error: Could not load image {image}")
+    return frame
+
+
+def _get_analyzer(player_id):
+    """Cached ShotAnalyzer for a player"""
+    with _ANALYZER_LOCK:
+        analyzer = _ANALYZER_CACHE.get(player_id)
+        if analyzer is None:
+            analyzer = _ANALYZER_CACHE[player_id] = ShotAnalyzer(player_id=player_id)
+        return analyzer
+
+
+def warm_up_analyzer(player_id=1):
+    """Load the shot model and compile the hit gate ahead of the first shot
+
+    Call it from the thread that will score shots: CUDA graph state in
+    reduce-overhead mode is kept per thread.
+    """
+    _get_analyzer(player_id)
+    with _YOLO_LOCK:
+        _load_gate()
+
+
+def analyze_shot(image, hand_bbox=None, player_id=1):
+    """Convenience function to analyze a single shot (frame or image path)"""
+    return _get_analyzer(player_id).is_valid_hit(image, hand_bbox)
+
+
+def analyze_shots(images, hand_bboxes=None, player_ids=None):
+    """Analyze a burst of shots (frames or image paths) with a single YOLO call.
+
+    hand_bboxes and player_ids are per-shot lists (defaults: no hand, player 1).
+    Returns one hit boolean per shot; unreadable images count as misses.
+    """
+    n = len(images)
+    hand_bboxes = hand_bboxes if hand_bboxes is not None else [None] * n
+    player_ids = player_ids if player_ids is not None else [1] * n
+
+    frames = [_load_frame(image) for image in images]
+    valid = [i for i, frame in enumerate(frames) if frame is not None]
+    hits = [False] * n
+    if not valid:
+        return hits
+
+    # Every analyzer shares the same model, so one call covers all players that
+    # use the same input size (normally all of them)
+    analyzers = {i: _get_analyzer(player_ids[i]) for i in valid}
+    by_imgsz = {}
+    for i in valid:
+        by_imgsz.setdefault(analyzers[i].imgsz, []).append(i)
+
+    for imgsz, group in by_imgsz.items():
+        targets = _find_targets([analyzers[i] for i in group], [frames[i] for i in group],
+                                [hand_bboxes[i] for i in group], imgsz)
+        for i, target in zip(group, targets):
+            hits[i] = analyzers[i].judge_target(frames[i], target)
+    return hits
 
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1] == "--export":
+        export_shot_model(sys.argv[2])
+    elif len(sys.argv) > 1:
         image_path = sys.argv[1]
         analyze_shot(image_path)
     else:
         print("Usage: python shot_analyzer.py <image_path>")
+        print("       python shot_analyzer.py --export engine|openvino")